@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LoginSystem.settings')
 
 application = get_asgi_application()
+
+# Compile URLs/templates and import Pillow now instead of on the first request.
+# Connections are not warmed under ASGI: request code runs in other threads than this one.
+from LoginSystem.warmup import warm_up_application, warmup_enabled  # noqa: E402
+
+if warmup_enabled():
+    warm_up_application()
@@ -0,0 +1,230 @@
+"""
+Response compression middleware for LoginSystem project.
+
+Negotiates gzip, Brotli (``brotli`` package) or Zstandard (``zstandard``
+package) from the request's Accept-Encoding header, using whichever
+encoders are importable. Only content types listed in
+``COMPRESSION_CONTENT_TYPES`` are compressed, each with its own level per
+encoding, and responses shorter than ``COMPRESSION_MIN_SIZE`` are left
+alone. Streaming responses are compressed chunk by chunk and flushed after
+every chunk, so a streamed listing keeps reaching the client as it is
+produced.
+"""
+
+import gzip
+import io
+import secrets
+import string
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_MIN_SIZE = 512
+
+# Content type -> {encoding: level}. Types not listed are never compressed.
+DEFAULT_CONTENT_TYPES = {
+    'application/json': {'zstd': 3, 'br': 4, 'gzip': 6},
+    'text/html': {'zstd': 3, 'br': 4, 'gzip': 6},
+    'text/css': {'zstd': 6, 'br': 8, 'gzip': 9},
+    'text/javascript': {'zstd': 6, 'br': 8, 'gzip': 9},
+    'application/javascript': {'zstd': 6, 'br': 8, 'gzip': 9},
+    'text/plain': {'zstd': 3, 'br': 4, 'gzip': 6},
+}
+
+# Server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = ('zstd', 'br', 'gzip')
+
+
+class GzipCompressor:
+    """
+    Incremental gzip writer. Like Django's GZipMiddleware, a random length
+    filename is written to the header to mitigate BREACH.
+    """
+
+    max_random_bytes = 100
+
+    def __init__(self, level):
+        self.buffer = io.BytesIO()
+        filename = ''.join(
+            secrets.choice(string.ascii_letters)
+            for _ in range(secrets.randbelow(self.max_random_bytes))
+        )
+        self.file = gzip.GzipFile(
+            filename=filename, mode='wb', compresslevel=level, fileobj=self.buffer, mtime=0
+        )
+
+    def _drain(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def compress(self, chunk):
+        self.file.write(chunk)
+        self.file.flush(zlib.Z_SYNC_FLUSH)
+        return self._drain()
+
+    def finish(self):
+        self.file.close()
+        return self._drain()
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, chunk):
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk):
+        return self.compressor.compress(chunk) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+def available_compressors():
+    """
+    Return {encoding: compressor class} for the encoders installed here
+    """
+    compressors = {'gzip': GzipCompressor}
+    if brotli is not None:
+        compressors['br'] = BrotliCompressor
+    if zstandard is not None:
+        compressors['zstd'] = ZstdCompressor
+    return compressors
+
+
+def compress_bytes(encoding, level, data):
+    compressor = available_compressors()[encoding](level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header into {coding: q}
+    """
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with the best encoding both sides support.
+    Sets Vary: Accept-Encoding on every compressible response so caches
+    keep one copy per encoding.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+        self.content_types = getattr(settings, 'COMPRESSION_CONTENT_TYPES', DEFAULT_CONTENT_TYPES)
+        self.compressors = available_compressors()
+
+    def choose_encoding(self, request, levels):
+        accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        wildcard = accepted.get('*', 0.0)
+        best, best_q = None, 0.0
+        for encoding in ENCODING_PREFERENCE:
+            if encoding not in levels or encoding not in self.compressors:
+                continue
+            q = accepted.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def process_response(self, request, response):
+        # Avoid compressing if we've already got a content-encoding.
+        if response.has_header('Content-Encoding'):
+            return response
+
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        levels = self.content_types.get(content_type)
+        if not levels:
+            return response
+
+        # It's not worth attempting to compress really short responses.
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.choose_encoding(request, levels)
+        if encoding is None:
+            return response
+
+        compressor = self.compressors[encoding](levels[encoding])
+
+        if response.streaming:
+            # Pull to lexical scope in case streaming_content is set again later.
+            original_iterator = response.streaming_content
+            if response.is_async:
+                async def compress_async():
+                    async for chunk in original_iterator:
+                        data = compressor.compress(chunk)
+                        if data:
+                            yield data
+                    yield compressor.finish()
+
+                response.streaming_content = compress_async()
+            else:
+                def compress_sync():
+                    for chunk in original_iterator:
+                        data = compressor.compress(chunk)
+                        if data:
+                            yield data
+                    yield compressor.finish()
+
+                response.streaming_content = compress_sync()
+            # Compressed size is unknown until the stream is consumed.
+            del response.headers['Content-Length']
+        else:
+            compressed_content = compressor.compress(response.content) + compressor.finish()
+            # Return the compressed content only if it's actually shorter.
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # A strong ETag no longer matches the encoded bytes; make it weak.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
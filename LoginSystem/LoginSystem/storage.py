@@ -0,0 +1,61 @@
+"""
+Static files storage for LoginSystem project.
+
+Extends ManifestStaticFilesStorage so that ``collectstatic`` also writes
+gzip (and Brotli, when the ``brotli`` package is installed) copies of every
+hashed text asset next to the original. A front-end server can then serve
+``<name>.gz`` / ``<name>.br`` directly (e.g. nginx ``gzip_static`` /
+``brotli_static``) with a far-future cache lifetime, since hashed names
+change whenever the content does.
+"""
+
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    compress_extensions = ('.css', '.js', '.svg', '.json', '.txt', '.xml', '.html')
+    min_compress_size = 256  # bytes; smaller files are not worth an extra round of negotiation
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = []
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names.append(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+
+        for hashed_name in dict.fromkeys(hashed_names):
+            if hashed_name.endswith(self.compress_extensions):
+                self.compress_file(hashed_name)
+
+    def compress_file(self, name):
+        """
+        Write precompressed variants of name, keeping only those that are smaller
+        """
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < self.min_compress_size:
+            return
+
+        variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+        for suffix, compress in variants:
+            compressed_name = name + suffix
+            if self.exists(compressed_name):
+                # Hashed names are content addressed, so an existing file is current
+                continue
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                with open(self.path(compressed_name), 'wb') as f:
+                    f.write(compressed)
@@ -0,0 +1,106 @@
+"""
+Worker warm-up for LoginSystem project.
+
+Moves one-off costs out of the first request a worker serves:
+
+``warm_up_application()`` compiles URL patterns and Loginify templates,
+loads the staticfiles manifest and imports Pillow. It holds no sockets or
+file handles, so it is safe to run in a gunicorn master before forking
+(``preload_app``); workers inherit the warmed state.
+
+``warm_up_connections()`` opens and pings each database connection.
+Connections must not cross a fork, so it runs once per worker (gunicorn
+``post_worker_init`` hook, see ``gunicorn.conf.py``). WSGI sync worker
+only: Django connections are per thread, and ASGI/threaded workers run
+request code on other threads than the one that would be warmed. Requires
+``CONN_MAX_AGE`` > 0 for the opened connection to be reused by requests.
+
+Set ``DJANGO_WARMUP=0`` to disable both.
+"""
+
+import os
+
+from django.apps import apps
+from django.urls import URLResolver, get_resolver
+
+PERSISTENT_CONN_MAX_AGE = 60
+
+
+def warmup_enabled():
+    return os.environ.get('DJANGO_WARMUP', '1') != '0'
+
+
+def _compile_patterns(resolver):
+    for pattern in resolver.url_patterns:
+        # Regexes are compiled lazily on first access
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            _compile_patterns(pattern)
+
+
+def warm_up_urls():
+    resolver = get_resolver()
+    _compile_patterns(resolver)
+    # Builds the reverse() lookup tables
+    resolver.reverse_dict
+
+
+def warm_up_templates():
+    """
+    Compile every Loginify template into the cached loader
+    """
+    from django.template.loader import get_template
+
+    template_dir = os.path.join(apps.get_app_config('Loginify').path, 'templates', 'Loginify')
+    for filename in sorted(os.listdir(template_dir)):
+        if filename.endswith('.html'):
+            get_template(f'Loginify/{filename}')
+
+
+def warm_up_static():
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    # Forces the lazy storage (and its manifest, if any) to load
+    staticfiles_storage._setup()
+
+
+def warm_up_imaging():
+    from PIL import Image
+
+    # Registers all image format plugins that Image.open() would load lazily
+    Image.init()
+
+
+def warm_up_application():
+    warm_up_urls()
+    warm_up_templates()
+    warm_up_static()
+    warm_up_imaging()
+
+
+def enable_persistent_connections(max_age=PERSISTENT_CONN_MAX_AGE):
+    """
+    Keep database connections between requests, unless DJANGO_CONN_MAX_AGE
+    sets CONN_MAX_AGE explicitly. Only for workers that serve every request
+    on the calling thread.
+    """
+    from django.db import connections
+
+    if 'DJANGO_CONN_MAX_AGE' in os.environ:
+        return
+    for alias in connections:
+        # Shared with the DatabaseWrapper, which reads it on connect
+        connections.settings[alias]['CONN_MAX_AGE'] = max_age
+
+
+def warm_up_connections():
+    from django.db import connections
+
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def warm_up():
+    warm_up_application()
+    warm_up_connections()
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LoginSystem.settings')
 
 application = get_wsgi_application()
+
+# Compile URLs/templates and import Pillow now instead of on the first request.
+# Per-worker DB connections are opened by the post_worker_init hook in gunicorn.conf.py.
+from LoginSystem.warmup import warm_up_application, warmup_enabled  # noqa: E402
+
+if warmup_enabled():
+    warm_up_application()
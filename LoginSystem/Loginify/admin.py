@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserDetails
+from .models import UserDetails, UserStatistic, CreationDayCount
 
 # Register your models here.
 
@@ -8,3 +8,11 @@ class UserDetailsAdmin(admin.ModelAdmin):
     list_display = ('username', 'email')
     search_fields = ('username', 'email')
     list_filter = ('email',)
+
+@admin.register(UserStatistic)
+class UserStatisticAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value')
+
+@admin.register(CreationDayCount)
+class CreationDayCountAdmin(admin.ModelAdmin):
+    list_display = ('day', 'count')
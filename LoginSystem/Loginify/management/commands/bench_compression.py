@@ -0,0 +1,75 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from LoginSystem.middleware import available_compressors, compress_bytes
+
+LEVELS = {
+    'gzip': range(1, 10),
+    'br': range(0, 12),
+    'zstd': (1, 3, 6, 9, 12, 19),
+}
+
+
+def sample_users_payload(count):
+    """
+    Build a body shaped like the /users/ JSON response
+    """
+    users = [
+        {
+            'username': f'user{i}',
+            'email': f'user{i}@example.com',
+            'password': f'pw{i % 9973}',
+        }
+        for i in range(count)
+    ]
+    return json.dumps({'status': 'success', 'count': count, 'users': users}).encode()
+
+
+class Command(BaseCommand):
+    help = 'Report CPU time against bytes saved for each compression encoding and level'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5000,
+                            help='Number of users in the synthetic /users/ payload')
+        parser.add_argument('--file', help='Benchmark the contents of this file instead '
+                                           '(e.g. a saved dashboard or profile page)')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Runs per level; the fastest is reported')
+
+    def handle(self, *args, **options):
+        if options['file']:
+            try:
+                with open(options['file'], 'rb') as f:
+                    payload = f.read()
+            except OSError as e:
+                raise CommandError(f'Cannot read {options["file"]}: {e}')
+            source = options['file']
+        else:
+            payload = sample_users_payload(options['users'])
+            source = f'/users/ payload with {options["users"]} users'
+
+        self.stdout.write(f'{source}: {len(payload)} bytes')
+        self.stdout.write(f'{"encoding":<8} {"level":>5} {"bytes":>10} {"ratio":>7} {"saved":>10} {"cpu ms":>8} {"MB/s":>8}')
+
+        for encoding in available_compressors():
+            for level in LEVELS[encoding]:
+                best = None
+                for _ in range(options['repeat']):
+                    start = time.process_time()
+                    compressed = compress_bytes(encoding, level, payload)
+                    elapsed = time.process_time() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                size = len(compressed)
+                throughput = len(payload) / best / 1e6 if best else float('inf')
+                self.stdout.write(
+                    f'{encoding:<8} {level:>5} {size:>10} {size / len(payload):>7.3f} '
+                    f'{len(payload) - size:>10} {best * 1000:>8.2f} {throughput:>8.1f}'
+                )
+
+        missing = {'br', 'zstd'} - set(available_compressors())
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f'Not benchmarked (package not installed): {", ".join(sorted(missing))}'
+            ))
@@ -0,0 +1,76 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so every measurement starts cold.
+# Mirrors a gunicorn sync worker: import the WSGI module (which runs
+# warm_up_application), run the post_worker_init warm-up, then serve
+# the same path twice.
+CHILD_SCRIPT = """
+import json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LoginSystem.settings')
+from LoginSystem.wsgi import application
+from LoginSystem.warmup import warm_up_connections, warmup_enabled
+if warmup_enabled():
+    warm_up_connections()
+ready = time.perf_counter()
+
+def request(path):
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    started = time.perf_counter()
+    response = application(environ, lambda status, headers: None)
+    b''.join(response)
+    response.close()
+    return time.perf_counter() - started
+
+first = request(sys.argv[1])
+second = request(sys.argv[1])
+print(json.dumps({'startup': ready - start, 'first': first, 'second': second}))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Measure worker cold-start time and first-request latency with and without warm-up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', action='append',
+                            help='Path to request (repeatable, default: /login/ and /signup/)')
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Fresh processes per path and mode; medians are reported')
+
+    def run_child(self, path, warmup):
+        # Same connection reuse gunicorn.conf.py sets for the sync worker
+        env = dict(os.environ, DJANGO_WARMUP='1' if warmup else '0', DJANGO_CONN_MAX_AGE='60')
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, path],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Benchmark process failed for {path}:\n{result.stderr}')
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        paths = options['path'] or ['/login/', '/signup/']
+        self.stdout.write(f'Median of {options["runs"]} fresh processes (times in ms)')
+        self.stdout.write(f'{"path":<20} {"warm-up":<8} {"startup":>9} {"1st req":>9} {"2nd req":>9}')
+
+        for path in paths:
+            for warmup in (False, True):
+                runs = [self.run_child(path, warmup) for _ in range(options['runs'])]
+                startup, first, second = (
+                    statistics.median(run[key] for run in runs) * 1000
+                    for key in ('startup', 'first', 'second')
+                )
+                self.stdout.write(
+                    f'{path:<20} {"on" if warmup else "off":<8} '
+                    f'{startup:>9.1f} {first:>9.1f} {second:>9.1f}'
+                )
@@ -0,0 +1,177 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from Loginify.models import UserDetails
+from Loginify.uploads import discard_expired_upload, iter_expired_uploads
+
+PROFILE_PICTURES_DIR = 'profile_pictures'
+
+
+def iter_media_files(root, min_age):
+    """
+    Stream (name, size) for every file under root, depth first.
+    Names are relative to MEDIA_ROOT with '/' separators, matching how
+    ImageField stores them. Files newer than min_age seconds are skipped
+    so an upload that has not been saved to its row yet is left alone.
+    """
+    cutoff = time.time() - min_age
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        if stat.st_mtime > cutoff:
+                            continue
+                        name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+                        yield name.replace(os.sep, '/'), stat.st_size
+        except FileNotFoundError:
+            continue
+
+
+def iter_batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def delete_media_file(name):
+    """
+    Delete one orphaned file and its user directory if that left it empty
+    """
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    try:
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        # Directory still holds other files
+        pass
+    return True
+
+
+def iter_empty_directories(root, min_age):
+    """
+    Stream empty directories under root (not root itself), deepest first,
+    skipping those modified within min_age seconds: an upload may be about
+    to write into a directory it has just created.
+    """
+    cutoff = time.time() - min_age
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if dirpath == root or filenames:
+            continue
+        try:
+            if os.path.getmtime(dirpath) > cutoff:
+                continue
+            with os.scandir(dirpath) as entries:
+                if next(entries, None) is not None:
+                    continue
+        except FileNotFoundError:
+            continue
+        yield dirpath
+
+
+class Command(BaseCommand):
+    help = ('Find and delete profile picture files no longer referenced by any UserDetails row, '
+            'and partial chunked uploads that have expired')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report orphaned files and reclaimable bytes')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of files checked against the database per query')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Number of threads used to delete files')
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='Ignore files modified within this many seconds')
+        parser.add_argument('--skip-uploads', action='store_true',
+                            help='Do not sweep expired partial uploads')
+
+    def handle(self, *args, **options):
+        self.clean_profile_pictures(options)
+        if not options['skip_uploads']:
+            self.clean_expired_uploads(options['dry_run'])
+
+    def clean_profile_pictures(self, options):
+        root = os.path.join(settings.MEDIA_ROOT, PROFILE_PICTURES_DIR)
+        if not os.path.isdir(root):
+            self.stdout.write(f'No profile pictures to check: {root} does not exist.')
+            return
+
+        dry_run = options['dry_run']
+        scanned = orphaned = reclaimable = deleted = 0
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            files = iter_media_files(root, options['min_age'])
+            for batch in iter_batches(files, options['batch_size']):
+                scanned += len(batch)
+                names = [name for name, size in batch]
+                referenced = set(
+                    UserDetails.objects.filter(profile_picture__in=names)
+                    .values_list('profile_picture', flat=True)
+                )
+                orphans = [(name, size) for name, size in batch if name not in referenced]
+                if not orphans:
+                    continue
+
+                orphaned += len(orphans)
+                reclaimable += sum(size for name, size in orphans)
+                if dry_run:
+                    for name, size in orphans:
+                        self.stdout.write(f'Would delete {name} ({size} bytes)')
+                    continue
+
+                deleted += sum(executor.map(delete_media_file, [name for name, size in orphans]))
+
+        # User directories left empty, e.g. by deleted users
+        empty_dirs = removed_dirs = 0
+        for path in iter_empty_directories(root, options['min_age']):
+            empty_dirs += 1
+            if dry_run:
+                self.stdout.write(f'Would remove empty directory {os.path.relpath(path, settings.MEDIA_ROOT)}')
+                continue
+            try:
+                os.rmdir(path)
+                removed_dirs += 1
+            except OSError:
+                # Written to since it was found
+                pass
+
+        self.stdout.write(f'Scanned {scanned} files, found {orphaned} orphaned ({reclaimable} bytes) '
+                          f'and {empty_dirs} empty directories.')
+        if dry_run:
+            self.stdout.write(self.style.WARNING('Dry run: no files were deleted.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} files and {removed_dirs} directories.'))
+
+    def clean_expired_uploads(self, dry_run):
+        """
+        Delete chunked uploads abandoned past UPLOAD_STATE_TIMEOUT, each one
+        as a unit under its upload lock
+        """
+        count = reclaimable = 0
+        for user_dir, upload_id, size in iter_expired_uploads():
+            if dry_run:
+                self.stdout.write(f'Would delete expired upload {upload_id} ({size} bytes)')
+            elif not discard_expired_upload(user_dir, upload_id):
+                # In use or resumed since it was listed
+                continue
+            count += 1
+            reclaimable += size
+
+        verb = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(f'{verb} {count} expired uploads ({reclaimable} bytes).')
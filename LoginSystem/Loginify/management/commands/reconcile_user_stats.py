@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from Loginify.stats import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute user statistics from UserDetails and fix any drift (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        drift = reconcile()
+        for name, stored, actual in drift:
+            self.stdout.write(f'{name}: stored {stored}, actual {actual}')
+        if drift:
+            self.stdout.write(self.style.WARNING(f'Corrected {len(drift)} drifted statistics.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('User statistics are up to date.'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:30
+
+import Loginify.models
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Loginify', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdetails',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='userdetails',
+            name='profile_picture',
+            field=models.ImageField(blank=True, help_text='Upload a profile picture (JPG, PNG, GIF supported)', null=True, upload_to=Loginify.models.user_profile_picture_path, verbose_name='Profile Picture'),
+        ),
+        migrations.AddField(
+            model_name='userdetails',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 21:10
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+
+def check_duplicate_emails(apps, schema_editor):
+    """
+    Fail with the offending addresses rather than a bare IntegrityError
+    when the unique index cannot be built
+    """
+    UserDetails = apps.get_model('Loginify', 'UserDetails')
+    duplicates = list(
+        UserDetails.objects.using(schema_editor.connection.alias)
+        .values_list(Lower(Trim('email')), flat=True)
+        .annotate(count=models.Count('pk'))
+        .filter(count__gt=1)
+        .order_by()[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            'Cannot add a case-insensitive unique index on email: these addresses '
+            'belong to more than one user: ' + ', '.join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Loginify', '0002_userdetails_profile_picture_timestamps'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='userdetails',
+            name='email_normalized',
+            field=models.GeneratedField(db_persist=True, expression=Lower(Trim('email')), output_field=models.EmailField(max_length=254), unique=True),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 21:40
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def seed_user_statistics(apps, schema_editor):
+    """
+    Start the counters from the current table so signals only need to apply deltas
+    """
+    UserDetails = apps.get_model('Loginify', 'UserDetails')
+    UserStatistic = apps.get_model('Loginify', 'UserStatistic')
+    CreationDayCount = apps.get_model('Loginify', 'CreationDayCount')
+    db_alias = schema_editor.connection.alias
+    users = UserDetails.objects.using(db_alias)
+
+    UserStatistic.objects.using(db_alias).bulk_create([
+        UserStatistic(name='total_users', value=users.count()),
+        UserStatistic(
+            name='users_with_profile_picture',
+            value=users.exclude(profile_picture__isnull=True).exclude(profile_picture='').count(),
+        ),
+    ])
+    by_day = (
+        users.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(count=models.Count('pk'))
+        .values_list('day', 'count')
+    )
+    CreationDayCount.objects.using(db_alias).bulk_create(
+        [CreationDayCount(day=day, count=count) for day, count in by_day]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Loginify', '0003_userdetails_email_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreationDayCount',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Users by Creation Day',
+                'verbose_name_plural': 'Users by Creation Day',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserStatistic',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'User Statistic',
+                'verbose_name_plural': 'User Statistics',
+            },
+        ),
+        migrations.RunPython(seed_user_statistics, migrations.RunPython.noop),
+    ]
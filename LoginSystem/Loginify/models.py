@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower, Trim
 from django.utils import timezone
 import os
 
@@ -15,11 +16,28 @@ def user_profile_picture_path(instance, filename):
     filename = f"{instance.username}.{ext}"
     return os.path.join('profile_pictures', instance.username, filename)
 
+def normalize_email(email):
+    """
+    Canonical form used for email lookups and uniqueness
+    Case-insensitive: 'Alice@Example.com ' -> 'alice@example.com'
+    Returns a database expression built from the same functions as
+    UserDetails.email_normalized, so a lookup always matches the stored value
+    """
+    return Lower(Trim(models.Value(email or '')))
+
 class UserDetails(models.Model):
     #UserDetails model for storing user registration info
     
     username = models.CharField(max_length=50, primary_key=True)
     email = models.EmailField(unique=True)
+    # Computed by the database, so save(), bulk_create(), update() and raw SQL all keep
+    # it in sync; all lookups go through this index
+    email_normalized = models.GeneratedField(
+        expression=Lower(Trim('email')),
+        output_field=models.EmailField(max_length=254),
+        db_persist=True,
+        unique=True,
+    )
     password = models.CharField(max_length=12, blank=True)
     profile_picture = models.ImageField(
         upload_to=user_profile_picture_path,
@@ -34,6 +52,32 @@ class UserDetails(models.Model):
     def __str__(self):
         return self.username
     
+    def save(self, *args, **kwargs):
+        # The statistics receivers run in post_save: commit their deltas together with the
+        # row (deletes already run their signals inside the delete transaction)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_profile_picture()
+        return instance
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None or 'profile_picture' in fields:
+            self._remember_profile_picture()
+    
+    def _remember_profile_picture(self):
+        """
+        Record whether the loaded row had a picture, so the statistics signals can
+        tell whether a save added or removed one. Reads the raw stored name to skip
+        building a FieldFile; None when the field was deferred (.only()/.defer()).
+        """
+        name = self.__dict__.get('profile_picture', models.DEFERRED)
+        self._had_profile_picture = None if name is models.DEFERRED else bool(name)
+    
     def get_profile_picture_url(self):
         """
         Return profile picture URL or default avatar
@@ -42,17 +86,58 @@ class UserDetails(models.Model):
             return self.profile_picture.url
         return '/static/images/default-avatar.png'  # Default avatar path
     
-    def delete_old_profile_picture(self):
+    def delete_old_profile_picture(self, prune_directory=False):
         """
-        Delete old profile picture file when updating
+        Delete old profile picture file when updating.
+        With prune_directory, also remove the user's picture directory if that left it empty.
         """
         if self.profile_picture:
+            storage = self.profile_picture.storage
             try:
-                if os.path.isfile(self.profile_picture.path):
-                    os.remove(self.profile_picture.path)
-            except:
-                pass
+                storage.delete(self.profile_picture.name)
+            except OSError:
+                # File already gone or not removable; leave it to cleanup_profile_pictures
+                return
+            if prune_directory:
+                try:
+                    os.rmdir(os.path.dirname(storage.path(self.profile_picture.name)))
+                except NotImplementedError:
+                    # Not a local filesystem storage; no directories to prune
+                    pass
+                except OSError:
+                    # Directory still holds other files
+                    pass
     
     class Meta:
         verbose_name = "User Detail"
         verbose_name_plural = "User Details"
+
+class UserStatistic(models.Model):
+    #Running totals over UserDetails, kept up to date by Loginify.signals
+    
+    TOTAL_USERS = 'total_users'
+    USERS_WITH_PROFILE_PICTURE = 'users_with_profile_picture'
+    
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+    
+    class Meta:
+        verbose_name = "User Statistic"
+        verbose_name_plural = "User Statistics"
+
+class CreationDayCount(models.Model):
+    #Current users per created_at day; deleting a user subtracts it, so this is not a signup log
+    
+    day = models.DateField(primary_key=True)
+    count = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.day}: {self.count}"
+    
+    class Meta:
+        verbose_name = "Users by Creation Day"
+        verbose_name_plural = "Users by Creation Day"
+        ordering = ['-day']
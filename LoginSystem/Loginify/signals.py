@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import UserDetails, UserStatistic
+from .stats import adjust_creation_day, adjust_statistic
+
+
+@receiver(post_delete, sender=UserDetails)
+def delete_profile_picture_on_user_delete(sender, instance, **kwargs):
+    """
+    Remove the user's profile picture file, and its now empty directory, once the row is gone.
+    Deferred to commit so a rolled back delete keeps its file.
+    """
+    if instance.profile_picture:
+        transaction.on_commit(lambda: instance.delete_old_profile_picture(prune_directory=True))
+
+
+@receiver(post_save, sender=UserDetails)
+def update_statistics_on_user_save(sender, instance, created, **kwargs):
+    """
+    Apply this save's change to the user statistics
+    """
+    if created:
+        adjust_statistic(UserStatistic.TOTAL_USERS, 1)
+        adjust_creation_day(instance.created_at, 1)
+    
+    if 'profile_picture' in instance.get_deferred_fields():
+        # Picture was neither loaded nor saved
+        return
+    has_picture = bool(instance.profile_picture)
+    # Recorded by UserDetails.from_db(); None when not known
+    had_picture = False if created else getattr(instance, '_had_profile_picture', None)
+    if had_picture is not None:
+        # Unknown previous state (loaded deferred, or never loaded) is left to reconcile_user_stats
+        adjust_statistic(UserStatistic.USERS_WITH_PROFILE_PICTURE, int(has_picture) - int(had_picture))
+    instance._had_profile_picture = has_picture
+
+
+@receiver(post_delete, sender=UserDetails)
+def update_statistics_on_user_delete(sender, instance, **kwargs):
+    adjust_statistic(UserStatistic.TOTAL_USERS, -1)
+    adjust_creation_day(instance.created_at, -1)
+    if instance.profile_picture:
+        adjust_statistic(UserStatistic.USERS_WITH_PROFILE_PICTURE, -1)
@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import UserDetails, UserStatistic, CreationDayCount
+
+# Incrementally maintained user statistics
+# Signals in Loginify.signals apply deltas; reconcile() recomputes from UserDetails.
+
+
+def _adjust(model, lookup, field, delta):
+    """
+    Atomically add delta to one counter row, creating it on first use
+    """
+    if not model.objects.filter(**lookup).update(**{field: F(field) + delta}):
+        with transaction.atomic():
+            model.objects.get_or_create(**lookup)
+            model.objects.filter(**lookup).update(**{field: F(field) + delta})
+
+def adjust_statistic(name, delta):
+    if delta:
+        _adjust(UserStatistic, {'name': name}, 'value', delta)
+
+def adjust_creation_day(created_at, delta):
+    if delta:
+        day = timezone.localdate(created_at)
+        _adjust(CreationDayCount, {'day': day}, 'count', delta)
+        if delta < 0:
+            # Days without users are not stored
+            CreationDayCount.objects.filter(day=day, count__lte=0).delete()
+
+def get_user_statistics(days=30):
+    """
+    Current totals plus current users by creation day for the most recent days
+    """
+    values = dict(UserStatistic.objects.values_list('name', 'value'))
+    return {
+        'total_users': values.get(UserStatistic.TOTAL_USERS, 0),
+        'users_with_profile_picture': values.get(UserStatistic.USERS_WITH_PROFILE_PICTURE, 0),
+        'users_by_creation_day': [
+            {'day': row.day.isoformat(), 'count': row.count}
+            for row in CreationDayCount.objects.filter(count__gt=0)[:days]
+        ],
+    }
+
+def compute_user_statistics():
+    """
+    Recompute every statistic from UserDetails (full scan)
+    """
+    users = UserDetails.objects.all()
+    totals = {
+        UserStatistic.TOTAL_USERS: users.count(),
+        UserStatistic.USERS_WITH_PROFILE_PICTURE: users.exclude(profile_picture__isnull=True)
+                                                       .exclude(profile_picture='').count(),
+    }
+    daily = dict(
+        users.annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(count=Count('pk'))
+        .values_list('day', 'count')
+    )
+    return totals, daily
+
+@transaction.atomic
+def reconcile():
+    """
+    Overwrite the stored statistics with freshly computed ones.
+    Returns a list of (statistic, stored, actual) for every value that had drifted.
+    """
+    # Lock the counters before counting. Signal deltas commit in the same transaction
+    # as their row, so a concurrent signup or delete is either already in the count or
+    # waits on these locks and applies its delta on top of the fresh value.
+    stored = dict(UserStatistic.objects.select_for_update().values_list('name', 'value'))
+    stored_daily = dict(CreationDayCount.objects.select_for_update().values_list('day', 'count'))
+    totals, daily = compute_user_statistics()
+    drift = []
+    
+    for name, actual in totals.items():
+        if stored.get(name) != actual:
+            drift.append((name, stored.get(name, 0), actual))
+            UserStatistic.objects.update_or_create(name=name, defaults={'value': actual})
+    
+    for day in stored_daily.keys() - daily.keys():
+        if stored_daily[day] != 0:
+            drift.append((f'users created {day}', stored_daily[day], 0))
+    CreationDayCount.objects.filter(day__in=stored_daily.keys() - daily.keys()).delete()
+    for day, actual in daily.items():
+        if stored_daily.get(day) != actual:
+            drift.append((f'users created {day}', stored_daily.get(day, 0), actual))
+            CreationDayCount.objects.update_or_create(day=day, defaults={'count': actual})
+    
+    return drift
@@ -1,3 +1,553 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from LoginSystem.middleware import CompressionMiddleware, GzipCompressor
+from LoginSystem.storage import CompressedManifestStaticFilesStorage
+
+from . import uploads
+from .models import UserDetails
+from .stats import get_user_statistics, reconcile
+
+# The manifest storage needs collectstatic; tests render pages without it
+PLAIN_STATIC_STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class StaticStorageTests(TestCase):
+
+    def test_missing_file_is_an_error(self):
+        # A typo or a missed collectstatic must fail loudly, not render an unhashed URL
+        with self.assertRaises(ValueError):
+            CompressedManifestStaticFilesStorage().url('Loginify/css/nope.css')
+
+
+class ProfilePictureCleanupTests(TestCase):
+    """
+    cleanup_profile_pictures and the on-delete file removal
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def write_picture(self, name, age=7200):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'picture')
+        old = time.time() - age
+        os.utime(path, (old, old))
+        os.utime(os.path.dirname(path), (old, old))
+        return path
+
+    def cleanup(self, *args):
+        out = io.StringIO()
+        call_command('cleanup_profile_pictures', '--skip-uploads', *args, stdout=out)
+        return out.getvalue()
+
+    def test_orphans_across_batches(self):
+        kept, orphans = [], []
+        for i in range(5):
+            name = f'profile_pictures/user{i}/user{i}.png'
+            UserDetails.objects.create(username=f'user{i}', email=f'user{i}@example.com', profile_picture=name)
+            kept.append(self.write_picture(name))
+            orphans.append(self.write_picture(f'profile_pictures/gone{i}/gone{i}.png'))
+
+        output = self.cleanup('--batch-size', '3')
+        self.assertIn('Scanned 10 files, found 5 orphaned (35 bytes)', output)
+        self.assertTrue(all(os.path.exists(path) for path in kept))
+        self.assertFalse(any(os.path.exists(path) for path in orphans))
+        # Their user directories go with them
+        self.assertFalse(any(os.path.exists(os.path.dirname(path)) for path in orphans))
+
+    def test_dry_run(self):
+        orphan = self.write_picture('profile_pictures/gone/gone.png')
+        empty_dir = os.path.dirname(self.write_picture('profile_pictures/empty/x.png'))
+        os.remove(os.path.join(empty_dir, 'x.png'))
+        old = time.time() - 7200
+        os.utime(empty_dir, (old, old))
+
+        output = self.cleanup('--dry-run')
+        self.assertIn('Would delete profile_pictures/gone/gone.png (7 bytes)', output)
+        self.assertIn('Would remove empty directory profile_pictures/empty', output)
+        self.assertTrue(os.path.exists(orphan))
+        self.assertTrue(os.path.isdir(empty_dir))
+
+    def test_min_age(self):
+        recent = self.write_picture('profile_pictures/new/new.png', age=60)
+        old = self.write_picture('profile_pictures/old/old.png', age=7200)
+
+        self.cleanup()
+        self.assertTrue(os.path.exists(recent))
+        self.assertFalse(os.path.exists(old))
+
+        self.cleanup('--min-age', '30')
+        self.assertFalse(os.path.exists(recent))
+
+    def test_empty_user_directories_are_pruned(self):
+        path = self.write_picture('profile_pictures/gone/gone.png')
+        os.remove(path)
+        old = time.time() - 7200
+        os.utime(os.path.dirname(path), (old, old))
+        fresh_dir = os.path.join(self.media_root, 'profile_pictures', 'uploading')
+        os.makedirs(fresh_dir)
+
+        self.cleanup()
+        self.assertFalse(os.path.exists(os.path.dirname(path)))
+        # May be about to receive an upload
+        self.assertTrue(os.path.isdir(fresh_dir))
+
+    def test_delete_removes_file_on_commit(self):
+        name = 'profile_pictures/alice/alice.png'
+        path = self.write_picture(name)
+        user = UserDetails.objects.create(username='alice', email='alice@example.com', profile_picture=name)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            user.delete()
+        # Nothing is removed until the delete commits
+        self.assertTrue(os.path.exists(path))
+
+        for callback in callbacks:
+            callback()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(os.path.dirname(path)))
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class PageRenderTests(TestCase):
+    """
+    Pages render and link their stylesheets
+    """
+
+    def setUp(self):
+        UserDetails.objects.create(username='alice', email='alice@example.com', password='pw')
+
+    def test_login_page(self):
+        response = self.client.get(reverse('login'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Loginify/css/base.css')
+        self.assertContains(response, 'Loginify/css/login.css')
+
+    def test_dashboard_page(self):
+        self.client.post(reverse('login'), {'email': 'alice@example.com', 'password': 'pw'})
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Loginify/css/base.css')
+        self.assertContains(response, 'Loginify/css/dashboard.css')
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class FragmentCacheTests(TestCase):
+    """
+    Cached user fragments on the dashboard and profile follow updated_at
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        UserDetails.objects.create(username='alice', email='alice@example.com', password='pw')
+        self.client.post(reverse('login'), {'email': 'alice@example.com', 'password': 'pw'})
+
+    def test_profile_edit_invalidates_cached_fragments(self):
+        self.assertNotContains(self.client.get(reverse('dashboard')), 'header-profile-picture')
+        self.assertNotContains(self.client.get(reverse('profile')), 'class="profile-picture"')
+        self.assertContains(self.client.get(reverse('profile')), 'alice@example.com')
+
+        # Bypassing save() leaves updated_at alone, so the cached fragments are served
+        UserDetails.objects.filter(pk='alice').update(email='alice@example.org')
+        self.assertContains(self.client.get(reverse('profile')), 'alice@example.com')
+
+        user = UserDetails.objects.get(pk='alice')
+        user.profile_picture = 'profile_pictures/alice/alice.png'
+        user.save()
+
+        self.assertContains(self.client.get(reverse('dashboard')), 'header-profile-picture')
+        response = self.client.get(reverse('profile'))
+        self.assertContains(response, 'class="profile-picture"')
+        self.assertContains(response, 'alice@example.org')
+        self.assertNotContains(response, 'alice@example.com')
+
+
+def make_image(fmt='PNG'):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), 'red').save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class ChunkedUploadTests(TestCase):
+    """
+    Resumable profile picture upload protocol
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        overrides = override_settings(FILE_UPLOAD_TEMP_DIR=self.temp_dir, MEDIA_ROOT=self.temp_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        UserDetails.objects.create(username='alice', email='alice@example.com', password='pw')
+        self.client.post(reverse('login'), {'email': 'alice@example.com', 'password': 'pw'})
+
+    def init(self, size, filename='me.png', client=None):
+        return (client or self.client).post(
+            reverse('chunked_upload_init'),
+            json.dumps({'filename': filename, 'size': size}),
+            content_type='application/json',
+        )
+
+    def put(self, upload_id, data, offset, **extra):
+        return self.client.put(
+            reverse('chunked_upload_chunk', args=[upload_id]), data,
+            content_type='application/octet-stream', headers={'Upload-Offset': str(offset)}, **extra,
+        )
+
+    def finalize(self, upload_id, client=None):
+        return (client or self.client).post(reverse('chunked_upload_finalize', args=[upload_id]))
+
+    def test_upload_in_chunks(self):
+        data = make_image()
+        upload_id = self.init(len(data)).json()['upload_id']
+        # State is on disk, not in the per-process cache
+        cache.clear()
+        half = len(data) // 2
+        self.assertEqual(self.put(upload_id, data[:half], 0).json()['offset'], half)
+        self.assertEqual(self.put(upload_id, data[half:], half).json()['offset'], len(data))
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 200)
+        user = UserDetails.objects.get(pk='alice')
+        self.assertEqual(user.profile_picture.name, 'profile_pictures/alice/alice.png')
+        self.assertEqual(os.listdir(uploads.upload_temp_dir()), [])
+
+    def test_offset_mismatch(self):
+        data = make_image()
+        upload_id = self.init(len(data)).json()['upload_id']
+        self.put(upload_id, data[:10], 0)
+
+        response = self.put(upload_id, data[:10], 0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 10)
+
+    def test_short_body_counts_only_received_bytes(self):
+        data = make_image()
+        upload_id = self.init(len(data)).json()['upload_id']
+
+        # Connection dropped after 5 of the announced 20 bytes
+        response = self.put(upload_id, b'', 0, **{'wsgi.input': io.BytesIO(data[:5]), 'CONTENT_LENGTH': '20'})
+        self.assertEqual(response.json()['offset'], 5)
+        self.assertEqual(self.finalize(upload_id).status_code, 409)
+
+        self.put(upload_id, data[5:], 5)
+        self.assertEqual(self.finalize(upload_id).status_code, 200)
+
+    def test_chunk_too_large(self):
+        upload_id = self.init(10).json()['upload_id']
+        self.assertEqual(self.put(upload_id, b'x' * 11, 0).status_code, 413)
+
+    def test_finalize_invalid_image(self):
+        upload_id = self.init(10).json()['upload_id']
+        self.put(upload_id, b'0123456789', 0)
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UserDetails.objects.get(pk='alice').profile_picture)
+        # Rejected upload is discarded
+        self.assertEqual(self.finalize(upload_id).status_code, 404)
+
+    def test_other_users_upload_id(self):
+        upload_id = self.init(10).json()['upload_id']
+
+        UserDetails.objects.create(username='bob', email='bob@example.com', password='pw')
+        other = Client()
+        other.post(reverse('login'), {'email': 'bob@example.com', 'password': 'pw'})
+        response = other.get(reverse('chunked_upload_chunk', args=[upload_id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.finalize(upload_id, client=other).status_code, 404)
+
+    def test_concurrent_writer_is_rejected(self):
+        upload_id = self.init(10).json()['upload_id']
+        with uploads.upload_lock('alice', upload_id):
+            self.assertEqual(self.put(upload_id, b'01234', 0).status_code, 409)
+        self.assertEqual(self.put(upload_id, b'01234', 0).status_code, 200)
+
+    def test_concurrent_puts_over_old_lock_file(self):
+        upload_id = self.init(10).json()['upload_id']
+        # Lock file left by an earlier request long ago: its age means nothing
+        lock_path = uploads.upload_paths('alice', upload_id)[2]
+        open(lock_path, 'w').close()
+        old = time.time() - 3600
+        os.utime(lock_path, (old, old))
+
+        test = self
+        responses = []
+
+        class SlowBody(io.BytesIO):
+            # Second PUT arrives while the first is still reading its body
+            def read(self, *args):
+                if not responses:
+                    responses.append(test.put(upload_id, b'abcde', 0))
+                return super().read(*args)
+
+        first = self.put(upload_id, b'', 0, **{'wsgi.input': SlowBody(b'01234'), 'CONTENT_LENGTH': '5'})
+        self.assertEqual(first.json()['offset'], 5)
+        self.assertEqual(responses[0].status_code, 409)
+        with open(uploads.upload_paths('alice', upload_id)[1], 'rb') as f:
+            self.assertEqual(f.read(), b'01234')
+
+    def test_sweep_skips_upload_in_use(self):
+        upload_id = self.init(10).json()['upload_id']
+        old = time.time() - uploads.UPLOAD_STATE_TIMEOUT - 60
+        for path in uploads.upload_paths('alice', upload_id)[:2]:
+            os.utime(path, (old, old))
+
+        with uploads.upload_lock('alice', upload_id):
+            call_command('cleanup_profile_pictures', stdout=io.StringIO())
+            self.assertTrue(os.path.exists(uploads.upload_paths('alice', upload_id)[1]))
+        call_command('cleanup_profile_pictures', stdout=io.StringIO())
+        self.assertEqual(os.listdir(uploads.upload_temp_dir()), [])
+
+    def test_pending_upload_limit(self):
+        for _ in range(uploads.MAX_PENDING_UPLOADS):
+            self.assertEqual(self.init(10).status_code, 201)
+        self.assertEqual(self.init(10).status_code, 429)
+
+    def test_expired_uploads_are_swept(self):
+        upload_id = self.init(10).json()['upload_id']
+        old = time.time() - uploads.UPLOAD_STATE_TIMEOUT - 60
+        for path in uploads.upload_paths('alice', upload_id)[:2]:
+            os.utime(path, (old, old))
+
+        call_command('cleanup_profile_pictures', stdout=io.StringIO())
+        self.assertEqual(os.listdir(uploads.upload_temp_dir()), [])
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    """
+    Accept-Encoding negotiation and response rewriting
+    """
+
+    body = json.dumps([{'username': f'user{i}', 'email': f'user{i}@example.com'} for i in range(100)]).encode()
+
+    def compress(self, response, accept_encoding='gzip', compressors=None):
+        middleware = CompressionMiddleware(lambda request: response)
+        # Only gzip is guaranteed to be installed
+        middleware.compressors = compressors or {'gzip': GzipCompressor}
+        request = RequestFactory().get('/', headers={'Accept-Encoding': accept_encoding})
+        return middleware(request)
+
+    def json_response(self, body=None, content_type='application/json'):
+        return HttpResponse(self.body if body is None else body, content_type=content_type)
+
+    def test_gzip(self):
+        response = self.compress(self.json_response())
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_gzip_refused(self):
+        for accept_encoding in ('', 'identity', 'gzip;q=0', 'br', '*;q=0', '*, gzip;q=0'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.compress(self.json_response(), accept_encoding)
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertEqual(response.content, self.body)
+                # Still varies: another client may get a compressed copy
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_wildcard_and_case(self):
+        for accept_encoding in ('*', 'GZIP', 'deflate, *;q=0.1', 'gzip; q=0.5'):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.compress(self.json_response(), accept_encoding)
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_highest_q_value_wins(self):
+        # Stand-in encoder so negotiation between two codings can be tested without brotli
+        compressors = {'gzip': GzipCompressor, 'br': GzipCompressor}
+        cases = [
+            ('gzip, br', 'br'),  # equal q: server preference
+            ('gzip;q=1.0, br;q=0.5', 'gzip'),
+            ('gzip;q=0.5, br;q=0.8', 'br'),
+            ('br;q=0, *', 'gzip'),
+            ('br;q=bogus, gzip;q=0.1', 'gzip'),
+        ]
+        for accept_encoding, expected in cases:
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.compress(self.json_response(), accept_encoding, compressors)
+                self.assertEqual(response['Content-Encoding'], expected)
+
+    @override_settings(COMPRESSION_MIN_SIZE=512)
+    def test_min_size(self):
+        response = self.compress(self.json_response(b'x' * 511))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.compress(self.json_response(b'x' * 512))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_other_content_types_pass_through(self):
+        for content_type in ('image/png', 'application/octet-stream'):
+            with self.subTest(content_type=content_type):
+                response = self.compress(self.json_response(content_type=content_type))
+                self.assertFalse(response.has_header('Content-Encoding'))
+                self.assertFalse(response.has_header('Vary'))
+                self.assertEqual(response.content, self.body)
+
+    def test_already_encoded_response_is_left_alone(self):
+        response = self.json_response()
+        response['Content-Encoding'] = 'br'
+        response = self.compress(response)
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(response.content, self.body)
+
+    def test_only_compressed_if_smaller(self):
+        incompressible = os.urandom(4096)
+        response = self.compress(self.json_response(incompressible, content_type='text/plain'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, incompressible)
+
+    def test_strong_etag_is_weakened(self):
+        response = self.json_response()
+        response['ETag'] = '"abc"'
+        self.assertEqual(self.compress(response)['ETag'], 'W/"abc"')
+
+        response = self.json_response()
+        response['ETag'] = 'W/"abc"'
+        self.assertEqual(self.compress(response)['ETag'], 'W/"abc"')
+
+    def chunks(self):
+        return [self.body[i:i + 1000] for i in range(0, len(self.body), 1000)]
+
+    def assert_streamed(self, response, parts):
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        # Every chunk is flushed: the first part already decodes to the first chunk
+        decompressor = zlib.decompressobj(wbits=31)
+        self.assertEqual(decompressor.decompress(parts[0]), self.chunks()[0])
+        self.assertEqual(gzip.decompress(b''.join(parts)), self.body)
+
+    def test_streaming_response(self):
+        response = StreamingHttpResponse(iter(self.chunks()), content_type='application/json')
+        response['Content-Length'] = str(len(self.body))
+        response = self.compress(response)
+        self.assert_streamed(response, list(response.streaming_content))
+
+    def test_async_streaming_response(self):
+        async def stream():
+            for chunk in self.chunks():
+                yield chunk
+
+        async def consume(response):
+            return [part async for part in response.streaming_content]
+
+        response = self.compress(StreamingHttpResponse(stream(), content_type='application/json'))
+        self.assert_streamed(response, asyncio.run(consume(response)))
+
+
+@override_settings(STORAGES=PLAIN_STATIC_STORAGES)
+class EmailLookupTests(TestCase):
+    """
+    Emails are unique and looked up regardless of case and surrounding spaces
+    """
+
+    def setUp(self):
+        UserDetails.objects.create(username='alice', email='Alice@Example.com', password='pw')
+
+    def test_signup_with_other_casing_is_rejected(self):
+        response = self.client.post(
+            reverse('signup'),
+            json.dumps({'username': 'alice2', 'email': ' ALICE@example.COM', 'password': 'pw'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UserDetails.objects.count(), 1)
+
+    def test_login_with_other_casing(self):
+        response = self.client.post(reverse('login'), {'email': 'alice@EXAMPLE.com ', 'password': 'pw'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.session['user_id'], 'alice')
+
+    def test_get_update_delete_with_other_casing(self):
+        response = self.client.get(reverse('user_detail', args=['ALICE@example.com']))
+        self.assertEqual(response.json()['user']['username'], 'alice')
+
+        response = self.client.post(reverse('update_user', args=['alice@example.COM']),
+                                    json.dumps({'password': 'new'}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserDetails.objects.get(pk='alice').password, 'new')
+
+        response = self.client.post(reverse('delete_user', args=['aLiCe@example.com']))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(UserDetails.objects.exists())
+
+    def test_writes_that_bypass_save(self):
+        # The database computes email_normalized, so bulk writes cannot leave it stale
+        UserDetails.objects.bulk_create([UserDetails(username='bob', email='Bob@Example.com')])
+        UserDetails.objects.filter(pk='alice').update(email='Carol@Example.com')
+        self.assertEqual(
+            dict(UserDetails.objects.values_list('username', 'email_normalized')),
+            {'alice': 'carol@example.com', 'bob': 'bob@example.com'},
+        )
+        with self.assertRaises(IntegrityError):
+            UserDetails.objects.bulk_create([UserDetails(username='bob2', email='BOB@example.com')])
+
+
+class UserStatisticsTests(TestCase):
+
+    def test_delete_leaves_no_drift_or_empty_days(self):
+        user = UserDetails.objects.create(username='alice', email='alice@example.com', password='pw')
+        user.delete()
+
+        self.assertEqual(get_user_statistics()['users_by_creation_day'], [])
+        self.assertEqual(reconcile(), [])
+
+    def test_profile_picture_count_follows_loaded_state(self):
+        UserDetails.objects.create(username='alice', email='alice@example.com', password='pw',
+                                   profile_picture='profile_pictures/alice/alice.png')
+        self.assertEqual(get_user_statistics()['users_with_profile_picture'], 1)
+
+        user = UserDetails.objects.get(pk='alice')
+        user.profile_picture = None
+        user.save()
+        self.assertEqual(get_user_statistics()['users_with_profile_picture'], 0)
+
+        # Previous state unknown: counter left alone rather than guessed
+        user = UserDetails.objects.only('pk').get(pk='alice')
+        user.profile_picture = 'profile_pictures/alice/alice.png'
+        user.save()
+        self.assertEqual(get_user_statistics()['users_with_profile_picture'], 0)
+        self.assertEqual(reconcile(), [('users_with_profile_picture', 0, 1)])
+
+    def test_username_change_keeps_creation_day(self):
+        created_at = timezone.now() - timedelta(days=3)
+        UserDetails.objects.create(username='alice', email='alice@example.com', password='pw',
+                                   created_at=created_at)
+
+        self.client.post(reverse('update_user', args=['alice@example.com']),
+                         json.dumps({'username': 'alice2'}), content_type='application/json')
+
+        self.assertEqual(UserDetails.objects.get(pk='alice2').created_at, created_at)
+        self.assertEqual(get_user_statistics()['users_by_creation_day'],
+                         [{'day': timezone.localdate(created_at).isoformat(), 'count': 1}])
@@ -0,0 +1,210 @@
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Storage for resumable (chunked) profile picture uploads
+# Everything lives on disk under <tmp>/loginify_uploads/<user>/ so every worker
+# process on the host sees the same state:
+#   <id>.json   upload state (filename, size, offset)
+#   <id>.part   bytes received so far
+#   <id>.lock   flock()ed while a worker writes a chunk, finalizes or discards
+
+UPLOAD_STATE_TIMEOUT = 24 * 60 * 60  # uploads expire 24 hours after their last chunk
+MAX_PENDING_UPLOADS = 3  # unfinished uploads one user may have at a time
+
+
+class UploadLocked(Exception):
+    pass
+
+
+class UploadNotFound(Exception):
+    pass
+
+
+def upload_temp_dir():
+    """
+    Directory holding partial uploads (outside MEDIA_ROOT so they are never served)
+    """
+    return os.path.join(settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir(), 'loginify_uploads')
+
+def user_upload_dir(username):
+    # Hashed so any username is a safe directory name
+    return os.path.join(upload_temp_dir(), hashlib.sha256(username.encode()).hexdigest()[:32])
+
+def _paths(user_dir, upload_id):
+    base = os.path.join(user_dir, upload_id)
+    return base + '.json', base + '.part', base + '.lock'
+
+def upload_paths(username, upload_id):
+    return _paths(user_upload_dir(username), upload_id)
+
+def is_valid_upload_id(upload_id):
+    return len(upload_id) == 32 and all(c in '0123456789abcdef' for c in upload_id)
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _is_expired(path, timeout):
+    try:
+        return time.time() - os.path.getmtime(path) > timeout
+    except FileNotFoundError:
+        return True
+
+def save_upload_state(username, upload_id, state):
+    state_path = upload_paths(username, upload_id)[0]
+    temp_path = f'{state_path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(state, f)
+    # Atomic, so a concurrent reader never sees a half written file
+    os.replace(temp_path, state_path)
+
+def load_upload_state(username, upload_id):
+    """
+    Return the upload state, or None if it does not exist or has expired
+    """
+    if not is_valid_upload_id(upload_id):
+        return None
+    state_path = upload_paths(username, upload_id)[0]
+    if _is_expired(state_path, UPLOAD_STATE_TIMEOUT):
+        # Files are left for discard_expired_upload(), which removes them under the lock
+        return None
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if state.get('username') != username:
+        return None
+    return state
+
+def count_pending_uploads(username):
+    """
+    Number of unexpired uploads the user has open
+    """
+    try:
+        names = os.listdir(user_upload_dir(username))
+    except FileNotFoundError:
+        return 0
+    pending = 0
+    for name in names:
+        if name.endswith('.json'):
+            upload_id = name[:-len('.json')]
+            if load_upload_state(username, upload_id) is not None:
+                pending += 1
+    return pending
+
+def create_upload(username, filename, size):
+    os.makedirs(user_upload_dir(username), exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    state = {'username': username, 'filename': filename, 'size': size, 'offset': 0}
+    # State first: a sweep that finds data without fresh state treats it as abandoned
+    save_upload_state(username, upload_id, state)
+    open(upload_paths(username, upload_id)[1], 'wb').close()
+    return upload_id, state
+
+def _discard(user_dir, upload_id):
+    state_path, part_path, lock_path = _paths(user_dir, upload_id)
+    for path in glob.glob(glob.escape(state_path) + '.*.tmp') + [state_path, part_path]:
+        _remove(path)
+    # Lock file last: whoever is waiting on it sees it unlinked and gives up
+    _remove(lock_path)
+    try:
+        os.rmdir(user_dir)
+    except OSError:
+        # Other uploads still pending
+        pass
+
+def discard_upload(username, upload_id):
+    """
+    Delete all files of an upload. Call with upload_lock() held.
+    """
+    _discard(user_upload_dir(username), upload_id)
+
+@contextmanager
+def _lock(user_dir, upload_id):
+    state_path, part_path, lock_path = _paths(user_dir, upload_id)
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_WRONLY, 0o600)
+    except FileNotFoundError:
+        # User directory already removed with the last upload
+        raise UploadNotFound()
+    try:
+        try:
+            # Released by the kernel when fd is closed, including if the worker dies
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadLocked()
+        try:
+            unlinked = os.fstat(fd).st_ino != os.stat(lock_path).st_ino
+        except FileNotFoundError:
+            unlinked = True
+        if unlinked:
+            # The previous holder discarded the upload while we were opening the file
+            raise UploadNotFound()
+        if not os.path.exists(state_path):
+            _remove(lock_path)
+            raise UploadNotFound()
+        yield
+    finally:
+        os.close(fd)
+
+def upload_lock(username, upload_id):
+    """
+    Exclusive lock on one upload across all worker processes, held until the
+    block exits. Raises UploadLocked if another request holds it and
+    UploadNotFound if the upload was discarded.
+    """
+    return _lock(user_upload_dir(username), upload_id)
+
+def iter_expired_uploads(max_age=UPLOAD_STATE_TIMEOUT):
+    """
+    Stream (user_dir, upload_id, size) for uploads whose state is older than
+    max_age seconds, or missing. size is the total of all their files.
+    """
+    root = upload_temp_dir()
+    try:
+        user_dirs = os.scandir(root)
+    except FileNotFoundError:
+        return
+    with user_dirs:
+        for user_dir in user_dirs:
+            if not user_dir.is_dir(follow_symlinks=False):
+                continue
+            sizes = {}
+            with os.scandir(user_dir.path) as entries:
+                for entry in entries:
+                    upload_id = entry.name.split('.', 1)[0]
+                    if entry.is_file(follow_symlinks=False) and is_valid_upload_id(upload_id):
+                        sizes[upload_id] = sizes.get(upload_id, 0) + entry.stat(follow_symlinks=False).st_size
+            for upload_id, size in sizes.items():
+                if _is_expired(_paths(user_dir.path, upload_id)[0], max_age):
+                    yield user_dir.path, upload_id, size
+
+def discard_expired_upload(user_dir, upload_id, max_age=UPLOAD_STATE_TIMEOUT):
+    """
+    Delete an upload found by iter_expired_uploads() as one unit, under its lock.
+    Returns False if it is in use or was resumed since it was found.
+    """
+    try:
+        with _lock(user_dir, upload_id):
+            if not _is_expired(_paths(user_dir, upload_id)[0], max_age):
+                return False
+            _discard(user_dir, upload_id)
+            return True
+    except UploadLocked:
+        return False
+    except UploadNotFound:
+        # State file gone: remove whatever a crashed request left behind
+        _discard(user_dir, upload_id)
+        return True
@@ -11,9 +11,13 @@ urlpatterns = [
     path('session-info/', views.session_info_view, name='session_info'),
     path('upload-profile-picture/', views.upload_profile_picture, name='upload_profile_picture'),
     path('remove-profile-picture/', views.remove_profile_picture, name='remove_profile_picture'),
+    path('upload-profile-picture/chunked/', views.chunked_upload_init, name='chunked_upload_init'),
+    path('upload-profile-picture/chunked/<str:upload_id>/', views.chunked_upload_chunk, name='chunked_upload_chunk'),
+    path('upload-profile-picture/chunked/<str:upload_id>/finalize/', views.chunked_upload_finalize, name='chunked_upload_finalize'),
     
     # API endpoints for CRUD operations
     path('users/', views.get_all_users_view, name='all_users'),
+    path('users/stats/', views.user_statistics_view, name='user_statistics'),
     re_path(r'^user/(?P<email>[^/]+)/update/$', views.update_user_view, name='update_user'),
     re_path(r'^user/(?P<email>[^/]+)/delete/$', views.delete_user_view, name='delete_user'),
     re_path(r'^user/(?P<email>[^/]+)/$', views.get_user_by_email_view, name='user_detail'),
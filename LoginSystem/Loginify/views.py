@@ -7,25 +7,42 @@ from urllib.parse import unquote
 import json
 import os
 from functools import wraps
+from django.core.files import File
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-from .models import UserDetails
+from .models import UserDetails, normalize_email
+from .stats import get_user_statistics
+from . import uploads
+
+MAX_PROFILE_PICTURE_SIZE = 5 * 1024 * 1024  # 5MB
+ALLOWED_IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
+
+# Resumable upload settings
+UPLOAD_CHUNK_MAX_SIZE = 1024 * 1024  # 1MB per PUT
+UPLOAD_READ_SIZE = 64 * 1024  # bytes read from the request stream at a time
 
 # File validation utility
+def validate_image_extension(filename):
+    """
+    Check the file extension against ALLOWED_IMAGE_EXTENSIONS
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if ext not in ALLOWED_IMAGE_EXTENSIONS:
+        return False, f"Invalid file type. Allowed types: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
+    return True, "Valid file extension"
+
 def validate_image_file(file):
     """
     Validate uploaded image file
     """
     # Check file size (max 5MB)
-    max_size = 5 * 1024 * 1024  # 5MB
-    if file.size > max_size:
+    if file.size > MAX_PROFILE_PICTURE_SIZE:
         return False, "File size too large. Maximum size is 5MB."
     
     # Check file extension
-    allowed_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp']
-    ext = os.path.splitext(file.name)[1].lower()
-    if ext not in allowed_extensions:
-        return False, f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
+    is_valid, error_message = validate_image_extension(file.name)
+    if not is_valid:
+        return False, error_message
     
     # Check if file is actually an image
     try:
@@ -95,8 +112,8 @@ def signup_view(request):
             messages.error(request, error_msg)
             return render(request, 'Loginify/signup.html')
         
-        # Check if email already exists (unique constraint)
-        if UserDetails.objects.filter(email=email).exists():
+        # Check if email already exists, ignoring case (unique constraint)
+        if UserDetails.objects.filter(email_normalized=normalize_email(email)).exists():
             error_msg = 'Email already exists. Please use a different email.'
             if is_api:
                 return JsonResponse({'status': 'error', 'message': error_msg}, status=400)
@@ -173,7 +190,7 @@ def login_view(request):
         
         try:
             # Check if user exists with provided email and password
-            user = UserDetails.objects.get(email=email, password=password)
+            user = UserDetails.objects.get(email_normalized=normalize_email(email), password=password)
 
             # Successful login - create session
             request.session['user_id'] = user.username
@@ -258,6 +275,18 @@ def session_info_view(request):
         'message': 'Session information retrieved successfully'
     })
 
+def save_profile_picture(user, uploaded_file):
+    """
+    Replace the user's profile picture with an already validated file
+    """
+    # Delete old profile picture if exists
+    if user.profile_picture:
+        user.delete_old_profile_picture()
+    
+    # Save new profile picture
+    user.profile_picture = uploaded_file
+    user.save()
+
 @login_required_session
 @csrf_exempt
 def upload_profile_picture(request):
@@ -282,13 +311,7 @@ def upload_profile_picture(request):
             return redirect('profile')
         
         try:
-            # Delete old profile picture if exists
-            if user.profile_picture:
-                user.delete_old_profile_picture()
-            
-            # Save new profile picture
-            user.profile_picture = uploaded_file
-            user.save()
+            save_profile_picture(user, uploaded_file)
             
             messages.success(request, 'Profile picture updated successfully!')
             
@@ -312,6 +335,208 @@ def upload_profile_picture(request):
     
     return redirect('profile')
 
+# Resumable (chunked) profile picture upload
+# 1. POST   /upload-profile-picture/chunked/                   {"filename": "...", "size": N}
+# 2. PUT    /upload-profile-picture/chunked/<id>/              raw bytes, Upload-Offset: <offset>
+#    GET    /upload-profile-picture/chunked/<id>/              current offset, to resume after a drop
+#    DELETE /upload-profile-picture/chunked/<id>/              cancel
+# 3. POST   /upload-profile-picture/chunked/<id>/finalize/     validate and save as profile picture
+# State and data are kept on disk by Loginify.uploads, shared by all worker processes.
+
+@login_required_session
+@csrf_exempt
+@require_http_methods(["POST"])
+def chunked_upload_init(request):
+    """
+    Start a resumable profile picture upload
+    """
+    try:
+        data = json.loads(request.body)
+        filename = os.path.basename(str(data.get('filename', '')))
+        size = int(data.get('size'))
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Send JSON data: {"filename": "...", "size": <bytes>}'
+        }, status=400)
+    
+    is_valid, error_message = validate_image_extension(filename)
+    if not is_valid:
+        return JsonResponse({'status': 'error', 'message': error_message}, status=400)
+    
+    if size <= 0 or size > MAX_PROFILE_PICTURE_SIZE:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'File size too large. Maximum size is 5MB.' if size > 0 else 'File is empty.'
+        }, status=413 if size > 0 else 400)
+    
+    username = request.session['user_id']
+    if uploads.count_pending_uploads(username) >= uploads.MAX_PENDING_UPLOADS:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Too many unfinished uploads. Finish or cancel one first '
+                       f'(maximum {uploads.MAX_PENDING_UPLOADS}).'
+        }, status=429)
+    
+    upload_id, state = uploads.create_upload(username, filename, size)
+    
+    return JsonResponse({
+        'status': 'success',
+        'upload_id': upload_id,
+        'offset': 0,
+        'size': size,
+        'max_chunk_size': UPLOAD_CHUNK_MAX_SIZE
+    }, status=201)
+
+def upload_not_found():
+    return JsonResponse({'status': 'error', 'message': 'Upload not found or expired'}, status=404)
+
+def upload_in_progress(offset):
+    return JsonResponse({
+        'status': 'error',
+        'message': 'Another request for this upload is in progress',
+        'offset': offset
+    }, status=409)
+
+@login_required_session
+@csrf_exempt
+@require_http_methods(["GET", "PUT", "DELETE"])
+def chunked_upload_chunk(request, upload_id):
+    """
+    Append one chunk (PUT), report progress (GET) or cancel (DELETE)
+    """
+    username = request.session['user_id']
+    state = uploads.load_upload_state(username, upload_id)
+    if state is None:
+        return upload_not_found()
+    
+    if request.method == 'GET':
+        return JsonResponse({'status': 'success', 'offset': state['offset'], 'size': state['size']})
+    
+    if request.method == 'DELETE':
+        try:
+            with uploads.upload_lock(username, upload_id):
+                uploads.discard_upload(username, upload_id)
+        except uploads.UploadLocked:
+            return upload_in_progress(state['offset'])
+        except uploads.UploadNotFound:
+            return upload_not_found()
+        return JsonResponse({'status': 'success', 'message': 'Upload cancelled'})
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.headers.get('Content-Length', ''))
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Upload-Offset and Content-Length headers are required'
+        }, status=400)
+    
+    # Enforce the size limits before reading the body
+    if length > UPLOAD_CHUNK_MAX_SIZE or offset + length > state['size']:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Chunk too large. Maximum chunk size is {UPLOAD_CHUNK_MAX_SIZE} bytes '
+                       f'and the upload is {state["size"]} bytes.'
+        }, status=413)
+    
+    # Only one writer per upload at a time, whichever worker it reaches
+    try:
+        with uploads.upload_lock(username, upload_id):
+            # Re-read under the lock: another worker may have just written a chunk
+            state = uploads.load_upload_state(username, upload_id)
+            if state is None:
+                return upload_not_found()
+            
+            # Client and server disagree on progress: tell it where to resume
+            if offset != state['offset']:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Offset mismatch',
+                    'offset': state['offset']
+                }, status=409)
+            
+            written = 0
+            part_path = uploads.upload_paths(username, upload_id)[1]
+            with open(part_path, 'r+b') as temp_file:
+                # Drop anything left over from an interrupted chunk
+                temp_file.truncate(offset)
+                temp_file.seek(offset)
+                while written < length:
+                    data = request.read(min(UPLOAD_READ_SIZE, length - written))
+                    if not data:
+                        break
+                    temp_file.write(data)
+                    written += len(data)
+            
+            # A short body (dropped connection) only counts up to what arrived
+            state['offset'] = offset + written
+            uploads.save_upload_state(username, upload_id, state)
+    except uploads.UploadLocked:
+        return upload_in_progress(state['offset'])
+    except uploads.UploadNotFound:
+        return upload_not_found()
+    
+    return JsonResponse({'status': 'success', 'offset': state['offset'], 'size': state['size']})
+
+@login_required_session
+@csrf_exempt
+@require_http_methods(["POST"])
+def chunked_upload_finalize(request, upload_id):
+    """
+    Validate the assembled file and save it as the user's profile picture
+    """
+    username = request.session['user_id']
+    state = uploads.load_upload_state(username, upload_id)
+    if state is None:
+        return upload_not_found()
+    
+    user = UserDetails.objects.get(username=username)
+    
+    try:
+        with uploads.upload_lock(username, upload_id):
+            state = uploads.load_upload_state(username, upload_id)
+            if state is None:
+                return upload_not_found()
+            
+            if state['offset'] != state['size']:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Upload is incomplete',
+                    'offset': state['offset'],
+                    'size': state['size']
+                }, status=409)
+            
+            try:
+                part_path = uploads.upload_paths(username, upload_id)[1]
+                with open(part_path, 'rb') as temp_file:
+                    uploaded_file = File(temp_file, name=state['filename'])
+                    
+                    # Same checks and save path as the single-request upload
+                    is_valid, error_message = validate_image_file(uploaded_file)
+                    if is_valid:
+                        save_profile_picture(user, uploaded_file)
+            except Exception as e:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'An error occurred while uploading the profile picture.'
+                }, status=500)
+            
+            uploads.discard_upload(username, upload_id)
+    except uploads.UploadLocked:
+        return upload_in_progress(state['offset'])
+    except uploads.UploadNotFound:
+        return upload_not_found()
+    
+    if not is_valid:
+        return JsonResponse({'status': 'error', 'message': error_message}, status=400)
+    
+    return JsonResponse({
+        'status': 'success',
+        'message': 'Profile picture updated successfully',
+        'profile_picture_url': user.get_profile_picture_url()
+    })
+
 @login_required_session
 def remove_profile_picture(request):
     """
@@ -380,12 +605,29 @@ def get_all_users_view(request):
             'message': 'Failed to retrieve users'
         }, status=500)
 
+def user_statistics_view(request):
+    """
+    User totals and users by creation day - API endpoint
+    Reads the incrementally maintained counters, so cost does not grow with the table
+    """
+    if not request.session.get('user_id') and request.content_type != 'application/json':
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Session required for web access. Please login first.',
+            'redirect': '/login/'
+        }, status=401)
+    
+    return JsonResponse({
+        'status': 'success',
+        'statistics': get_user_statistics()
+    })
+
 def get_user_by_email_view(request, email):
     #Get single user by email
     try:
         # Decode URL-encoded email (handles %40 -> @, etc.)
         decoded_email = unquote(email)
-        user = get_object_or_404(UserDetails, email=decoded_email)
+        user = get_object_or_404(UserDetails, email_normalized=normalize_email(decoded_email))
         user_data = {
             'username': user.username,
             'email': user.email,
@@ -410,7 +652,7 @@ def update_user_view(request, email):
     try:
         # Decode URL-encoded email (handles %40 -> @, etc.)
         decoded_email = unquote(email)
-        user = get_object_or_404(UserDetails, email=decoded_email)
+        user = get_object_or_404(UserDetails, email_normalized=normalize_email(decoded_email))
         
         if request.method == 'GET':
             # Return current user data
@@ -447,13 +689,15 @@ def update_user_view(request, email):
             
             # Handle username change (primary key change requires special handling)
             if new_username != user.username:
-                # Delete old record and create new one with same email
+                # Delete old record and create new one with same email and creation time
                 old_email = user.email
+                old_created_at = user.created_at
                 user.delete()
                 user = UserDetails.objects.create(
                     username=new_username,
                     email=old_email,
-                    password=new_password
+                    password=new_password,
+                    created_at=old_created_at
                 )
             else:
                 # Just update password (no primary key change)
@@ -491,7 +735,7 @@ def delete_user_view(request, email):
     try:
         # Decode URL-encoded email (handles if %40 -> @, etc.)
         decoded_email = unquote(email)
-        user = get_object_or_404(UserDetails, email=decoded_email)
+        user = get_object_or_404(UserDetails, email_normalized=normalize_email(decoded_email))
         username = user.username  # Store for response message
         
         # Delete the user
@@ -0,0 +1,40 @@
+"""
+gunicorn configuration for LoginSystem project.
+
+WSGI:  gunicorn -c gunicorn.conf.py LoginSystem.wsgi:application
+ASGI:  gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker LoginSystem.asgi:application
+       (or GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker)
+
+preload_app imports the application once in the master, which runs
+warm_up_application() before forking, so every worker starts with URLs
+and templates compiled.
+
+The sync worker serves every request on its main thread, so the database
+connection it opens in post_worker_init is the one requests use, and it
+is kept between requests (CONN_MAX_AGE). Threaded (gthread, which the sync
+worker becomes with --threads > 1), async and ASGI workers run request
+code on other threads or greenlets, each with its own connection, so for
+them the database is not warmed and connections are closed after each
+request. The check uses the worker gunicorn actually started, so it
+follows -k and --threads as well as this file.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+preload_app = True
+
+
+def post_worker_init(worker):
+    from gunicorn.workers.sync import SyncWorker
+    from LoginSystem.warmup import enable_persistent_connections, warm_up_connections, warmup_enabled
+
+    # gthread, gevent/eventlet and UvicornWorker are not SyncWorker subclasses
+    if not isinstance(worker, SyncWorker):
+        return
+    enable_persistent_connections()
+    if warmup_enabled():
+        warm_up_connections()